@@ -1,15 +1,264 @@
-from dataclasses import dataclass
+import asyncio
+import csv
+import shelve
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from dataclasses import dataclass, fields
+from itertools import count
+from typing import TextIO
+from urllib.parse import urljoin
 
+import httpx
+from lxml import html
+from lxml.etree import XPath
 
-@dataclass
+
+BASE_URL = "https://quotes.toscrape.com/"
+AUTHORS_CSV_PATH = "authors.csv"
+AUTHOR_BIOS_CACHE_PATH = ".author_bios.cache"
+PAGE_PREFETCH = 8
+REQUEST_TIMEOUT = httpx.Timeout(10)
+CONNECTION_LIMITS = httpx.Limits(
+    max_connections=64, max_keepalive_connections=32
+)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+CSV_BUFFER_SIZE = 1 << 20
+QUOTE_ROW_FORMAT = '"{}","{}","{}"\r\n'
+RESPONSE_CHUNK_SIZE = 1 << 16
+REQUEST_HEADERS = {
+    "Accept-Encoding": "gzip, br, deflate",
+    "User-Agent": "scrape-quotes/1.0",
+}
+
+QUOTES_XPATH = XPath("//div[@class='quote']")
+TEXT_XPATH = XPath("span[@class='text']/text()", smart_strings=False)
+AUTHOR_XPATH = XPath(".//small[@class='author']")
+TAGS_XPATH = XPath(
+    "div[@class='tags']/a[@class='tag']/text()", smart_strings=False
+)
+NEXT_PAGE_XPATH = XPath("//ul[@class='pager']/li[@class='next']")
+BIO_XPATH = XPath(
+    "string(//div[@class='author-details']/div[@class='author-description'])",
+    smart_strings=False,
+)
+
+
+@dataclass(slots=True, frozen=True)
 class Quote:
     text: str
     author: str
     tags: list[str]
 
 
+QUOTE_FIELDS = [field.name for field in fields(Quote)]
+
+
+def create_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        follow_redirects=True,
+        limits=CONNECTION_LIMITS,
+        timeout=REQUEST_TIMEOUT,
+        headers=REQUEST_HEADERS,
+        transport=transport,
+    )
+
+
+def parse_html(chunks: list[bytes], encoding: str | None) -> html.HtmlElement:
+    parser = html.HTMLParser(encoding=encoding)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+
+    return parser.close()
+
+
+async def fetch(
+    client: httpx.AsyncClient, url: str
+) -> html.HtmlElement:
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                chunks = [
+                    chunk
+                    async for chunk in response.aiter_bytes(
+                        RESPONSE_CHUNK_SIZE
+                    )
+                ]
+
+            if not chunks:
+                raise ValueError(f"Empty response body from {url}")
+
+            return await asyncio.to_thread(
+                parse_html, chunks, response.charset_encoding
+            )
+        except httpx.HTTPStatusError as error:
+            if (
+                error.response.status_code not in RETRY_STATUS_CODES
+                or attempt == MAX_RETRIES
+            ):
+                raise
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def get_author_bio(
+    client: httpx.AsyncClient, bio_cache: shelve.Shelf, author_url: str
+) -> str:
+    if author_url in bio_cache:
+        return bio_cache[author_url]
+
+    try:
+        page = await fetch(client, author_url)
+    except httpx.HTTPStatusError:
+        return ""
+
+    bio = BIO_XPATH(page).strip()
+
+    if bio:
+        bio_cache[author_url] = bio
+
+    return bio
+
+
+def encode_quote_row(text: str, author: str, tags: str) -> bytes:
+    return QUOTE_ROW_FORMAT.format(
+        text.replace('"', '""'),
+        author.replace('"', '""'),
+        tags.replace('"', '""'),
+    ).encode()
+
+
+def parse_single_quote(
+    quote_element: html.HtmlElement,
+) -> tuple[str, str, list[str], str]:
+    author_element = AUTHOR_XPATH(quote_element)[0]
+
+    return (
+        TEXT_XPATH(quote_element)[0],
+        author_element.text,
+        TAGS_XPATH(quote_element),
+        author_element.getnext().get("href"),
+    )
+
+
+async def fetch_page(
+    client: httpx.AsyncClient, page_num: int
+) -> html.HtmlElement:
+    return await fetch(client, urljoin(BASE_URL, f"page/{page_num}/"))
+
+
+async def iter_pages(
+    client: httpx.AsyncClient,
+) -> AsyncIterator[html.HtmlElement]:
+    page_nums = count(1)
+    pending = deque(
+        asyncio.create_task(fetch_page(client, next(page_nums)))
+        for _ in range(PAGE_PREFETCH)
+    )
+
+    try:
+        while True:
+            page = await pending.popleft()
+            yield page
+
+            if not NEXT_PAGE_XPATH(page):
+                break
+
+            pending.append(
+                asyncio.create_task(fetch_page(client, next(page_nums)))
+            )
+    finally:
+        for task in pending:
+            task.cancel()
+
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def open_csv(output_csv_path: str) -> TextIO:
+    return open(
+        output_csv_path,
+        "w",
+        encoding="utf-8",
+        newline="",
+        buffering=CSV_BUFFER_SIZE,
+    )
+
+
+async def iter_quotes(
+    client: httpx.AsyncClient,
+    bio_cache: shelve.Shelf,
+    bio_tasks: dict[str, asyncio.Task[str]],
+) -> AsyncIterator[tuple[str, str, list[str]]]:
+    async with aclosing(iter_pages(client)) as pages:
+        async for page in pages:
+            for quote_element in QUOTES_XPATH(page):
+                text, author, tags, author_link = parse_single_quote(
+                    quote_element
+                )
+
+                if author not in bio_tasks:
+                    author_url = urljoin(BASE_URL, author_link)
+                    bio_tasks[author] = asyncio.create_task(
+                        get_author_bio(client, bio_cache, author_url)
+                    )
+
+                yield text, author, tags
+
+
+async def write_quotes_to_csv(
+    quotes: AsyncIterator[tuple[str, str, list[str]]], output_csv_path: str
+) -> None:
+    with open(output_csv_path, "wb", buffering=CSV_BUFFER_SIZE) as file:
+        file.write(encode_quote_row(*QUOTE_FIELDS))
+
+        async for text, author, tags in quotes:
+            file.write(encode_quote_row(text, author, str(tags)))
+
+
+def write_authors_to_csv(
+    author_bios: dict[str, str], output_csv_path: str
+) -> None:
+    with open_csv(output_csv_path) as file:
+        writer = csv.writer(file)
+        writer.writerow(["author", "biography"])
+        writer.writerows(author_bios.items())
+
+
+async def scrape(output_csv_path: str) -> None:
+    bio_tasks = {}
+
+    async with create_client() as client:
+        with shelve.open(AUTHOR_BIOS_CACHE_PATH) as bio_cache:
+            try:
+                async with aclosing(
+                    iter_quotes(client, bio_cache, bio_tasks)
+                ) as quotes:
+                    await write_quotes_to_csv(quotes, output_csv_path)
+
+                bios = await asyncio.gather(*bio_tasks.values())
+            finally:
+                for task in bio_tasks.values():
+                    task.cancel()
+
+                await asyncio.gather(
+                    *bio_tasks.values(), return_exceptions=True
+                )
+
+    write_authors_to_csv(dict(zip(bio_tasks, bios)), AUTHORS_CSV_PATH)
+
+
 def main(output_csv_path: str) -> None:
-    pass
+    asyncio.run(scrape(output_csv_path))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,14 @@
+import asyncio
 import csv
+import io
+import shelve
 from pathlib import Path
 
-from app.parse import main, Quote
+import httpx
+import pytest
+
+from app import parse
+from app.parse import create_client, main, Quote
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -27,3 +34,221 @@ def test_main():
             assert correct_quote.text == result_row.text
             assert correct_quote.author == result_row.author
             assert correct_quote.tags == result_row.tags
+
+
+AUTHOR_PAGE = """
+<html><body><div class="author-details">
+    <div class="author-description">
+        Born in Ulm.
+    </div>
+</div></body></html>
+"""
+
+
+def mock_client(handler):
+    return create_client(httpx.MockTransport(handler))
+
+
+def fetch_author_bio(handler, cache_path, author_path="/author/A/"):
+    async def run():
+        async with mock_client(handler) as client:
+            with shelve.open(str(cache_path)) as bio_cache:
+                return await parse.get_author_bio(
+                    client, bio_cache, f"https://example.com{author_path}"
+                )
+
+    return asyncio.run(run())
+
+
+def test_get_author_bio_is_cached(tmp_path):
+    cache_path = tmp_path / "bios"
+
+    bio = fetch_author_bio(
+        lambda request: httpx.Response(200, html=AUTHOR_PAGE), cache_path
+    )
+    cached_bio = fetch_author_bio(
+        lambda request: httpx.Response(500), cache_path
+    )
+
+    assert bio == cached_bio == "Born in Ulm."
+
+
+def test_get_author_bio_does_not_cache_failures(tmp_path):
+    cache_path = tmp_path / "bios"
+
+    failed_bio = fetch_author_bio(
+        lambda request: httpx.Response(500), cache_path
+    )
+    empty_bio = fetch_author_bio(
+        lambda request: httpx.Response(200, html="<html></html>"), cache_path
+    )
+    bio = fetch_author_bio(
+        lambda request: httpx.Response(200, html=AUTHOR_PAGE), cache_path
+    )
+
+    assert failed_bio == empty_bio == ""
+    assert bio == "Born in Ulm."
+
+
+def test_get_author_bio_follows_redirects(tmp_path):
+    def handler(request):
+        if request.url.path == "/author/A":
+            return httpx.Response(
+                301, headers={"Location": "https://example.com/author/A/"}
+            )
+
+        return httpx.Response(200, html=AUTHOR_PAGE)
+
+    bio = fetch_author_bio(handler, tmp_path / "bios", "/author/A")
+
+    assert bio == "Born in Ulm."
+
+
+def quotes_page(page_num, num_pages):
+    next_link = (
+        '<ul class="pager"><li class="next"><a href="#">Next</a></li></ul>'
+        if page_num < num_pages
+        else ""
+    )
+
+    return f"""
+    <html><body>
+    <div class="quote">
+        <span class="text">Quote {page_num}</span>
+        <span>by <small class="author">Author {page_num}</small>
+        <a href="/author/{page_num}">(about)</a></span>
+        <div class="tags"><a class="tag" href="#">tag</a></div>
+    </div>
+    {next_link}
+    </body></html>
+    """
+
+
+def site_handler(
+    num_pages, failing_page=None, failing_author=None, author_delay=0
+):
+    async def handler(request):
+        section, num = request.url.path.strip("/").split("/")
+
+        if section == "author":
+            await asyncio.sleep(author_delay)
+
+            if int(num) == failing_author:
+                return httpx.Response(404)
+
+            return httpx.Response(200, html=AUTHOR_PAGE)
+
+        if int(num) == failing_page:
+            return httpx.Response(404)
+
+        return httpx.Response(200, html=quotes_page(int(num), num_pages))
+
+    return handler
+
+
+def test_scrape_cancels_bio_tasks_on_failure(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        parse,
+        "create_client",
+        lambda: mock_client(site_handler(3, failing_page=2, author_delay=1)),
+    )
+
+    async def run():
+        with pytest.raises(httpx.HTTPStatusError):
+            await parse.scrape("quotes.csv")
+
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(run()) == set()
+
+
+def test_scrape_writes_authors_when_an_author_page_fails(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        parse,
+        "create_client",
+        lambda: mock_client(site_handler(2, failing_author=1)),
+    )
+
+    asyncio.run(parse.scrape("quotes.csv"))
+
+    with open("quotes.csv", encoding="utf-8") as quotes_file:
+        assert len(list(csv.reader(quotes_file))) == 3
+
+    with open(parse.AUTHORS_CSV_PATH, encoding="utf-8") as authors_file:
+        assert list(csv.reader(authors_file)) == [
+            ["author", "biography"],
+            ["Author 1", ""],
+            ["Author 2", "Born in Ulm."],
+        ]
+
+    with shelve.open(parse.AUTHOR_BIOS_CACHE_PATH) as bio_cache:
+        assert list(bio_cache) == ["https://quotes.toscrape.com/author/2"]
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        ("plain", "Author", "['tag']"),
+        ('He said "no"', 'A "nick" name', "['a', 'b']"),
+        ("one, two", "Last, First", "['x', 'y']"),
+        ("line one\nline two", "Author", "[]"),
+        ("“Ça va?” — naïve", "André Gide", "['français']"),
+    ],
+)
+def test_encode_quote_row_round_trips(fields):
+    encoded = parse.encode_quote_row(*fields).decode("utf-8")
+
+    assert next(csv.reader(io.StringIO(encoded, newline=""))) == list(fields)
+
+    expected = io.StringIO()
+    csv.writer(expected, quoting=csv.QUOTE_ALL).writerow(fields)
+    assert encoded == expected.getvalue()
+
+
+def collect_pages(handler):
+    async def run():
+        async with mock_client(handler) as client:
+            pages = [
+                parse.TEXT_XPATH(parse.QUOTES_XPATH(page)[0])[0]
+                async for page in parse.iter_pages(client)
+            ]
+
+        return pages, asyncio.all_tasks() - {asyncio.current_task()}
+
+    return asyncio.run(run())
+
+
+def test_iter_pages_yields_pages_in_order_until_last(monkeypatch):
+    num_pages = parse.PAGE_PREFETCH + 4
+    requested = []
+    fetch_page = parse.fetch_page
+
+    def recording_fetch_page(client, page_num):
+        requested.append(page_num)
+        return fetch_page(client, page_num)
+
+    monkeypatch.setattr(parse, "fetch_page", recording_fetch_page)
+
+    pages, pending_tasks = collect_pages(site_handler(num_pages))
+
+    assert pages == [f"Quote {num}" for num in range(1, num_pages + 1)]
+    assert requested == list(range(1, num_pages + parse.PAGE_PREFETCH))
+    assert pending_tasks == set()
+
+
+@pytest.mark.parametrize("status_code", [404, 503])
+def test_iter_pages_raises_on_failed_page(status_code, monkeypatch):
+    monkeypatch.setattr(parse, "RETRY_BACKOFF", 0)
+
+    def handler(request):
+        if request.url.path == "/page/2/":
+            return httpx.Response(status_code, html="<p>Error</p>")
+
+        return httpx.Response(200, html=quotes_page(1, 3))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        collect_pages(handler)